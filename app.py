@@ -1,10 +1,58 @@
 import os
 import json
-import subprocess
 import requests
 import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, render_template, request, send_from_directory, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+# Use orjson for faster JSON parsing/serialization, fallback to stdlib json
+try:
+    import orjson
+    USE_ORJSON = True
+except ImportError:
+    USE_ORJSON = False
+
+def json_loads(raw):
+    """Parse JSON from str or bytes"""
+    if USE_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def json_dumps(data):
+    """Serialize data as compact JSON bytes"""
+    if USE_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+# Read once at import (os.umask can only be read by setting it); new files get 0o666 & ~umask
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def json_dump_file(data, path):
+    """Atomically replace path with data serialized as indented JSON"""
+    if USE_ORJSON:
+        raw = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        raw = json.dumps(data, indent=2).encode('utf-8')
+    
+    # Write next to the target and rename over it so readers never see a partial file
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)), delete=False) as f:
+        f.write(raw)
+        f.flush()
+        # NamedTemporaryFile is created 0600; keep the target's mode (or the usual default for a new file)
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.fchmod(f.fileno(), mode)
+        os.fsync(f.fileno())
+    os.replace(f.name, path)
 
 # Try to import Google Drive, fallback to local storage
 try:
@@ -15,68 +63,175 @@ except ImportError:
     USE_GDRIVE = False
     print("⚠️  Google Drive module not available, using local storage")
 
+# yt-dlp is used in-process rather than spawning the CLI for every URL
+try:
+    from yt_dlp import YoutubeDL
+    YTDLP_AVAILABLE = True
+except ImportError:
+    YTDLP_AVAILABLE = False
+
+# Use selectolax for HTML parsing if available, fallback to regex
+try:
+    from selectolax.parser import HTMLParser
+    USE_SELECTOLAX = True
+except ImportError:
+    USE_SELECTOLAX = False
+
 # YouTube integration
-import pickle
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload, build_http
+from google_auth_httplib2 import AuthorizedHttp
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 
 YOUTUBE_SCOPES = [
     "https://www.googleapis.com/auth/youtube.upload",
     "https://www.googleapis.com/auth/youtube.readonly"
 ]
 YOUTUBE_CLIENT_SECRETS = "client_secret.json"
-YOUTUBE_TOKEN_FILE = "youtube_token.pickle"
-youtube_service = None
+YOUTUBE_TOKEN_FILE = "youtube_token.json"
+YOUTUBE_LEGACY_TOKEN_FILE = "youtube_token.pickle"  # Migrated to YOUTUBE_TOKEN_FILE on first load
+YOUTUBE_CHUNK_SIZE = 8 * 1024 * 1024  # Resumable upload chunk size
+YOUTUBE_SINGLE_SHOT_LIMIT = 50 * 1024 * 1024  # Videos smaller than this are uploaded in one request
+YOUTUBE_REFRESH_MARGIN = timedelta(seconds=60)  # Refresh the token this long before it expires
+_YT = {"service": None, "creds": None}  # Cached YouTube service and its credentials
+_yt_lock = threading.Lock()
 
 # ------------------- CONFIG -------------------
 UPLOAD_FOLDER = "downloads"
-LINKS_FILE = "downloaded_links.json"
+LINKS_FILE = "downloaded_links.json"  # Snapshot of all links as of the last compaction
+LINKS_LOG = "downloaded_links.jsonl"  # Append-only log of links saved since the snapshot
+LINKS_COMPACT_EVERY = 1000  # Fold the log into the snapshot after this many appends
 INSTAGRAM_USERNAME = os.environ.get('INSTAGRAM_USERNAME', 'hikon_31')  # Get from env or use default
 INSTAGRAM_PASSWORD = os.environ.get('INSTAGRAM_PASSWORD', 'kolikoli')  # Get from env or use default
+MAX_DOWNLOAD_WORKERS = 4  # Parallel metadata fetches/downloads; kept small to avoid Instagram throttling
+INSTA_RE = re.compile(r'(?:https?://)?(?:[\w-]+\.)?instagram\.com/(?:p|reel)/(?P<code>[\w-]+)')  # Instagram post/reel URL, with or without scheme/subdomain
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # ------------------- FLASK APP -------------------
 app = Flask(__name__)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+# Only enable behind a server that handles X-Sendfile (Apache mod_xsendfile, lighttpd), otherwise responses
+# are empty. nginx does not: it uses X-Accel-Redirect instead.
+app.config["USE_X_SENDFILE"] = os.environ.get('USE_X_SENDFILE') == '1'
 
 # ------------------- LINK TRACKING -------------------
 
+# In-memory copy of the links data, reloaded only when the backing files change
+_LINKS_CACHE = {"data": None, "mtime": 0, "log_entries": 0, "url_to_entry": {}, "url_set": set()}
+_links_lock = threading.Lock()
+_save_lock = threading.Lock()  # Serializes read-modify-write of the links store
+
+def _links_mtime():
+    """Modification times of the local snapshot and log, used to invalidate the cache"""
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else 0
+                 for path in (LINKS_FILE, LINKS_LOG))
+
+def _read_links_file():
+    """Read the local JSON snapshot and merge in the append-only log, returns (data, log_entries)"""
+    data = {"links": [], "count": 0}
+    if os.path.exists(LINKS_FILE):
+        try:
+            with open(LINKS_FILE, 'rb') as f:
+                data = json_loads(f.read())
+        except:
+            pass
+    
+    log_entries = 0
+    if os.path.exists(LINKS_LOG):
+        # Entries already in the snapshot are skipped, in case compaction was interrupted
+        seen = {(item["url"], item.get("downloaded_at")) for item in data["links"]}
+        with open(LINKS_LOG, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json_loads(line)
+                except:
+                    continue  # Torn line from an interrupted write
+                log_entries += 1
+                if (entry["url"], entry.get("downloaded_at")) not in seen:
+                    data["links"].append(entry)
+    
+    data["count"] = len(data["links"])
+    return data, log_entries
+
+def _set_links_cache(data, mtime, log_entries=0):
+    """Replace the cached links data and rebuild the URL indexes (caller holds _links_lock)"""
+    url_to_entry = {item["url"]: item for item in data["links"]}
+    _LINKS_CACHE["data"] = data
+    _LINKS_CACHE["mtime"] = mtime
+    _LINKS_CACHE["log_entries"] = log_entries
+    _LINKS_CACHE["url_to_entry"] = url_to_entry
+    _LINKS_CACHE["url_set"] = set(url_to_entry)
+
+def _append_link(data, entry):
+    """Append a link entry to data and keep the URL indexes in sync (caller holds _links_lock)"""
+    data["links"].append(entry)
+    data["count"] = len(data["links"])
+    if data is _LINKS_CACHE["data"]:
+        _LINKS_CACHE["url_to_entry"][entry["url"]] = entry
+        _LINKS_CACHE["url_set"].add(entry["url"])
+
+def _load_local_links():
+    """Load links from the local snapshot + log, re-parsed only when either file changes"""
+    mtime = _links_mtime()
+    with _links_lock:
+        if _LINKS_CACHE["data"] is None or _LINKS_CACHE["mtime"] != mtime:
+            data, log_entries = _read_links_file()
+            _set_links_cache(data, mtime, log_entries)
+        return _LINKS_CACHE["data"]
+
+def _load_drive_links():
+    """Load links from Google Drive (the manager re-downloads only when the file changed)"""
+    data = gdrive_manager.get_downloaded_links()
+    with _links_lock:
+        # A new dict means Drive had a newer version; rebuild the URL indexes for it
+        if data is not _LINKS_CACHE["data"]:
+            _set_links_cache(data, "drive")
+    return data
+
 def load_downloaded_links():
     """Load previously downloaded links from Google Drive or local JSON file"""
     if USE_GDRIVE:
         try:
-            return gdrive_manager.get_downloaded_links()
+            return _load_drive_links()
         except Exception as e:
             print(f"⚠️  Google Drive error: {e}, falling back to local storage")
     
     # Fallback to local JSON
-    if os.path.exists(LINKS_FILE):
-        try:
-            with open(LINKS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {"links": [], "count": 0}
-    return {"links": [], "count": 0}
+    return _load_local_links()
 
-def save_downloaded_link(url, filename, youtube_url=None, gdrive_file_id=None):
+def save_downloaded_link(url, filename, youtube_url=None, gdrive_file_id=None,
+                         username=None, description=None):
     """Save downloaded link metadata to Google Drive or local file"""
+    entry = {
+        "url": url,
+        "filename": filename,
+        "youtube_url": youtube_url,
+        "gdrive_file_id": gdrive_file_id,
+        "username": username,
+        "description": description,
+        "downloaded_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+    with _save_lock:
+        _save_downloaded_link(entry)
+    
+    if _LINKS_CACHE["log_entries"] >= LINKS_COMPACT_EVERY:
+        compact_links()
+
+def _save_downloaded_link(entry):
+    """Append one link entry to the store (caller holds _save_lock)"""
+    url = entry["url"]
     if USE_GDRIVE:
         try:
-            # Get current data
-            data = load_downloaded_links()
+            # Get current data (straight from Drive, so an auth error skips to local storage)
+            data = _load_drive_links()
             
             # Add new link with YouTube URL and Google Drive file ID
-            from datetime import datetime
-            data["links"].append({
-                "url": url,
-                "filename": filename,
-                "youtube_url": youtube_url,
-                "gdrive_file_id": gdrive_file_id,
-                "downloaded_at": datetime.now().isoformat()
-            })
-            data["count"] = len(data["links"])
+            with _links_lock:
+                _append_link(data, entry)
             
             # Upload to Google Drive
             success = gdrive_manager.upload_file(data)
@@ -88,77 +243,126 @@ def save_downloaded_link(url, filename, youtube_url=None, gdrive_file_id=None):
         except Exception as e:
             print(f"⚠️  Google Drive error: {e}, using local storage")
     
-    # Fallback to local JSON
-    data = load_downloaded_links()
-    data["links"].append({
-        "url": url,
-        "filename": filename,
-        "youtube_url": youtube_url,
-        "gdrive_file_id": gdrive_file_id,
-        "downloaded_at": datetime.now().isoformat()
-    })
-    data["count"] = len(data["links"])
-    
-    with open(LINKS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    # Fallback to local JSON: append one line to the log instead of rewriting the snapshot
+    data = _load_local_links()
+    with _links_lock:
+        with open(LINKS_LOG, 'ab') as f:
+            f.write(json_dumps(entry) + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        
+        _append_link(data, entry)
+        _LINKS_CACHE["log_entries"] += 1
+        _LINKS_CACHE["mtime"] = _links_mtime()
     print(f"💾 Metadata saved to local file: {url}")
 
+def compact_links():
+    """Fold the append-only log into the JSON snapshot and start a fresh log"""
+    with _save_lock:
+        data = _load_local_links()
+        with _links_lock:
+            json_dump_file(data, LINKS_FILE)
+            if os.path.exists(LINKS_LOG):
+                os.remove(LINKS_LOG)
+            _LINKS_CACHE["log_entries"] = 0
+            _LINKS_CACHE["mtime"] = _links_mtime()
+    print(f"🗜️  Compacted local links file ({data['count']} links)")
+
 def is_already_downloaded(url):
     """Check if URL was already downloaded (checks Google Drive or local file)"""
-    if USE_GDRIVE:
-        try:
-            return gdrive_manager.is_already_downloaded(url)
-        except Exception as e:
-            print(f"⚠️  Google Drive check error: {e}, checking local storage")
-    
-    # Fallback to local check
-    data = load_downloaded_links()
-    return any(item["url"] == url for item in data["links"])
+    # Served from the in-memory cache; Drive is only re-downloaded when its file changed
+    load_downloaded_links()
+    return url in _LINKS_CACHE["url_set"]
+
+def get_downloaded_entry(url):
+    """Return the stored link entry for URL, or None"""
+    load_downloaded_links()
+    return _LINKS_CACHE["url_to_entry"].get(url)
 
 def get_youtube_url_if_uploaded(url):
     """Check if URL was already uploaded to YouTube and return the YouTube URL"""
-    data = load_downloaded_links()
-    for item in data["links"]:
-        if item["url"] == url:
-            return item.get("youtube_url")
-    return None
+    entry = get_downloaded_entry(url)
+    return entry.get("youtube_url") if entry else None
 
 # ------------------- YOUTUBE INTEGRATION -------------------
 
+def _youtube_creds_fresh(creds):
+    """True if creds are valid and not about to expire (early refresh only applies with a refresh token)"""
+    if not creds or not creds.valid:
+        return False
+    if creds.expiry is None or not creds.refresh_token:
+        return True
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now > YOUTUBE_REFRESH_MARGIN
+
 def authenticate_youtube():
-    """Authenticate with YouTube API"""
-    global youtube_service
-    
-    if youtube_service:
-        return youtube_service
-    
-    creds = None
-    
-    # Load token if exists
-    if os.path.exists(YOUTUBE_TOKEN_FILE):
-        with open(YOUTUBE_TOKEN_FILE, 'rb') as token:
-            creds = pickle.load(token)
+    """Authenticate with YouTube API
     
-    # If no valid credentials, login
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(YOUTUBE_CLIENT_SECRETS):
-                print("⚠️  YouTube API credentials not found (client_secret.json)")
-                return None
+    Runs under _yt_lock so concurrent requests that find an expiring token
+    trigger a single refresh and all reuse its result.
+    """
+    with _yt_lock:
+        creds = _YT["creds"]
+        
+        if _YT["service"] and _youtube_creds_fresh(creds):
+            return _YT["service"]
+        
+        # Load token if exists (creds stay cached in _YT afterwards, so this runs once)
+        if not creds and os.path.exists(YOUTUBE_TOKEN_FILE):
+            with open(YOUTUBE_TOKEN_FILE, 'r') as token:
+                try:
+                    creds = Credentials.from_authorized_user_info(json_loads(token.read()), YOUTUBE_SCOPES)
+                except ValueError as e:
+                    # to_json() omits a missing refresh_token, which from_authorized_user_info rejects
+                    print(f"⚠️  Unusable YouTube token ({e}), logging in again")
+        elif not creds and os.path.exists(YOUTUBE_LEGACY_TOKEN_FILE):
+            import pickle
+            with open(YOUTUBE_LEGACY_TOKEN_FILE, 'rb') as token:
+                creds = pickle.load(token)
+            with open(YOUTUBE_TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
+            os.remove(YOUTUBE_LEGACY_TOKEN_FILE)
+            print("🔁 Migrated YouTube token to JSON")
+        
+        # If no valid credentials (or they expire soon), refresh or login
+        if not _youtube_creds_fresh(creds):
+            if creds and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                if not os.path.exists(YOUTUBE_CLIENT_SECRETS):
+                    print("⚠️  YouTube API credentials not found (client_secret.json)")
+                    return None
+                
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    YOUTUBE_CLIENT_SECRETS, YOUTUBE_SCOPES)
+                creds = flow.run_local_server(port=0)
             
-            flow = InstalledAppFlow.from_client_secrets_file(
-                YOUTUBE_CLIENT_SECRETS, YOUTUBE_SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save credentials
-        with open(YOUTUBE_TOKEN_FILE, 'wb') as token:
-            pickle.dump(creds, token)
-    
-    youtube_service = build('youtube', 'v3', credentials=creds)
-    print("✅ YouTube authenticated successfully!")
-    return youtube_service
+            # Save credentials
+            with open(YOUTUBE_TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
+        
+        # A new creds object (e.g. from a fresh login) needs a new service; the old one is bound to the old creds
+        if not _YT["service"] or creds is not _YT["creds"]:
+            _YT["creds"] = creds
+            # The service holds a reference to creds, so later refreshes apply to it in place.
+            # It owns one persistent, authorized HTTP connection (build_http() also keeps the 308
+            # replies of resumable uploads from being treated as redirects).
+            http = AuthorizedHttp(creds, http=build_http())
+            _YT["service"] = build('youtube', 'v3', http=http, cache_discovery=False)
+            print("✅ YouTube authenticated successfully!")
+        return _YT["service"]
+
+def open_for_upload(path):
+    """Open a file for a sequential upload read, hinting the kernel to read ahead aggressively"""
+    f = open(path, 'rb')
+    # posix_fadvise is only available on Linux/Unix builds of Python
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+    return f
 
 def upload_to_youtube(video_path, title, description, tags=None, privacy="public"):
     """Upload video to YouTube"""
@@ -181,25 +385,31 @@ def upload_to_youtube(video_path, title, description, tags=None, privacy="public
             }
         }
         
-        # Use resumable upload
-        media = MediaFileUpload(
-            video_path,
-            chunksize=1024*1024,  # 1MB chunks
-            resumable=True,
-            mimetype="video/*"
-        )
-        
-        request = service.videos().insert(
-            part="snippet,status",
-            body=body,
-            media_body=media
-        )
-        
-        response = None
-        while response is None:
-            status, response = request.next_chunk()
-            if status:
-                print(f"📤 Upload progress: {int(status.progress() * 100)}%")
+        # Use resumable upload: small videos go up in a single request, larger ones in 8MB chunks
+        if os.path.getsize(video_path) < YOUTUBE_SINGLE_SHOT_LIMIT:
+            chunksize = -1
+        else:
+            chunksize = YOUTUBE_CHUNK_SIZE
+        
+        with open_for_upload(video_path) as video_file:
+            media = MediaIoBaseUpload(
+                video_file,
+                chunksize=chunksize,
+                resumable=True,
+                mimetype="video/*"
+            )
+            
+            request = service.videos().insert(
+                part="snippet,status",
+                body=body,
+                media_body=media
+            )
+            
+            response = None
+            while response is None:
+                status, response = request.next_chunk(num_retries=3)
+                if status:
+                    print(f"📤 Upload progress: {int(status.progress() * 100)}%")
         
         video_id = response.get("id")
         youtube_url = f"https://www.youtube.com/watch?v={video_id}"
@@ -213,37 +423,76 @@ def upload_to_youtube(video_path, title, description, tags=None, privacy="public
 
 # ------------------- INSTAGRAM METADATA SCRAPING -------------------
 
+# Shared HTTP session so scrapes reuse pooled keep-alive connections
+_HTTP = requests.Session()
+_HTTP.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+})
+_http_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                            max_retries=Retry(total=2, backoff_factor=0.3))
+_HTTP.mount('https://', _http_adapter)
+_HTTP.mount('http://', _http_adapter)
+
+# Patterns for scraping post HTML (bytes, so the body is never decoded as a whole)
+_OG_DESC_RE = re.compile(rb'<meta property="og:description" content="([^"]+)"')
+_USERNAME_RE = re.compile(r'@([a-zA-Z0-9._]+)')
+_SHARED_DATA_RE = re.compile(rb'window\._sharedData = (\{.+?\});</script>')
+
+def _parse_ytdlp_metadata(metadata):
+    """Extract (username, description) from a yt-dlp JSON info dict"""
+    # Extract username
+    username = metadata.get('uploader') or metadata.get('channel') or metadata.get('uploader_id')
+    
+    # Extract description
+    description = metadata.get('description') or metadata.get('title')
+    
+    # Clean up description if it's too long
+    if description and len(description) > 500:
+        description = description[:500] + '...'
+    
+    return username, description
+
+# yt-dlp options (instances are created per thread by _get_ytdl)
+_YTDL_BASE_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True,
+    'socket_timeout': 15,
+    'username': INSTAGRAM_USERNAME,
+    'password': INSTAGRAM_PASSWORD,
+}
+_YTDL_META_OPTS = {**_YTDL_BASE_OPTS, 'skip_download': True}
+_YTDL_DOWNLOAD_OPTS = {
+    **_YTDL_BASE_OPTS,
+    'format': 'best',
+    'outtmpl': os.path.join(UPLOAD_FOLDER, '%(id)s.%(ext)s'),
+}
+_ytdl_local = threading.local()
+# Long-lived pool shared by the metadata and download phases, so each worker's YoutubeDL
+# instances (and their Instagram session) are reused across URLs and requests
+_ytdl_pool = ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS, thread_name_prefix='ytdl')
+
+def _get_ytdl(kind):
+    """Return this thread's YoutubeDL instance for kind ('meta' or 'download')
+    
+    YoutubeDL objects are not thread-safe, so each worker thread gets its own.
+    """
+    ydl = getattr(_ytdl_local, kind, None)
+    if ydl is None:
+        ydl = YoutubeDL(_YTDL_META_OPTS if kind == 'meta' else _YTDL_DOWNLOAD_OPTS)
+        setattr(_ytdl_local, kind, ydl)
+    return ydl
+
 def get_instagram_metadata(post_url):
     """Fetch username and description from Instagram post/reel URL using yt-dlp"""
     try:
         # Use yt-dlp to extract metadata (much more reliable)
-        cmd = [
-            'yt-dlp',
-            '--dump-json',
-            '--no-playlist',
-            '--quiet',
-            '--no-warnings',
-            '--username', INSTAGRAM_USERNAME,
-            '--password', INSTAGRAM_PASSWORD,
-            post_url
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        
-        if result.returncode == 0 and result.stdout:
-            metadata = json.loads(result.stdout)
-            
-            # Extract username
-            username = metadata.get('uploader') or metadata.get('channel') or metadata.get('uploader_id')
-            
-            # Extract description
-            description = metadata.get('description') or metadata.get('title')
-            
-            # Clean up description if it's too long
-            if description and len(description) > 500:
-                description = description[:500] + '...'
-            
-            return username, description
+        info = _get_ytdl('meta').extract_info(post_url, download=False)
+        
+        if info:
+            return _parse_ytdlp_metadata(info)
         
         # Fallback to web scraping if yt-dlp fails
         return scrape_instagram_metadata(post_url)
@@ -253,32 +502,67 @@ def get_instagram_metadata(post_url):
         # Fallback to web scraping
         return scrape_instagram_metadata(post_url)
 
+def get_instagram_metadata_batch(post_urls):
+    """Fetch metadata for several URLs concurrently, returns {url: (username, description)}"""
+    if not post_urls:
+        return {}
+    
+    return dict(zip(post_urls, _ytdl_pool.map(get_instagram_metadata, post_urls)))
+
+def _parse_post_html(html):
+    """Return (og:description content, window._sharedData JSON) from post HTML bytes, either may be None"""
+    og_content = None
+    shared_json = None
+    parsed = False
+    
+    # Single linear pass with a real HTML parser when available
+    if USE_SELECTOLAX:
+        try:
+            tree = HTMLParser(html)
+            og = tree.css_first('meta[property="og:description"]')
+            if og:
+                og_content = og.attributes.get('content')
+            for script in tree.css('script'):
+                text = script.text().strip()
+                if text.startswith('window._sharedData'):
+                    shared_json = text.split('=', 1)[1].strip().rstrip(';')
+                    break
+            parsed = True
+        except Exception:
+            pass
+    
+    # Regex fallback (selectolax missing or raised); a missing tag after a clean parse is just missing
+    if not parsed:
+        og_match = _OG_DESC_RE.search(html)
+        if og_match:
+            og_content = og_match.group(1).decode('utf-8', errors='replace')
+        json_match = _SHARED_DATA_RE.search(html)
+        if json_match:
+            shared_json = json_match.group(1)
+    
+    return og_content, shared_json
+
 def scrape_instagram_metadata(post_url):
     """Fallback method: Scrape metadata from Instagram HTML"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-        
-        response = requests.get(post_url, headers=headers, timeout=10)
+        response = _HTTP.get(post_url, timeout=10)
         
         if response.status_code != 200:
             return None, None
         
-        html = response.text
+        html = response.content
         
         # Try to find JSON-LD data
         username = None
         description = None
         
+        og_content, shared_json = _parse_post_html(html)
+        
         # Extract from meta tags
-        og_description = re.search(r'<meta property="og:description" content="([^"]+)"', html)
-        if og_description:
-            description = og_description.group(1)
+        if og_content:
+            description = og_content
             # Parse username from description (format: "XXX Likes, XXX Comments - @username on Instagram: ...")
-            username_match = re.search(r'@([a-zA-Z0-9._]+)', description)
+            username_match = _USERNAME_RE.search(description)
             if username_match:
                 username = username_match.group(1)
             
@@ -287,10 +571,9 @@ def scrape_instagram_metadata(post_url):
                 description = description.split(' on Instagram: ', 1)[1].strip('"')
         
         # Alternative: Extract from JSON in HTML
-        json_match = re.search(r'window\._sharedData = ({.+?});</script>', html)
-        if json_match:
+        if shared_json:
             try:
-                shared_data = json.loads(json_match.group(1))
+                shared_data = json_loads(shared_json)
                 # Navigate through Instagram's data structure
                 entry_data = shared_data.get('entry_data', {})
                 post_page = entry_data.get('PostPage', [{}])[0]
@@ -314,54 +597,44 @@ def scrape_instagram_metadata(post_url):
 
 # ------------------- VIDEO DOWNLOAD -------------------
 
-def download_video_ytdlp(post_url):
-    """Download Instagram video using yt-dlp (server compatible version)"""
+def download_video_ytdlp(post_url, keep_local=False):
+    """Download Instagram video using yt-dlp (server compatible version)
+    
+    The local copy is deleted once it is safely on Google Drive, unless keep_local is set
+    (e.g. when the caller still needs the file for a YouTube upload).
+    """
     try:
-        output_template = os.path.join(UPLOAD_FOLDER, '%(id)s.%(ext)s')
-        
-        # Simple command without browser cookies (works on servers)
-        cmd = [
-            'yt-dlp',
-            '-f', 'best',
-            '-o', output_template,
-            '--no-playlist',
-            '--quiet',
-            '--no-warnings',
-            '--username', INSTAGRAM_USERNAME,
-            '--password', INSTAGRAM_PASSWORD,
-            post_url
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            files = [f for f in os.listdir(UPLOAD_FOLDER) 
-                    if f.endswith(('.mp4', '.jpg', '.png'))]
-            
-            if files:
-                latest_file = max(files, 
-                    key=lambda x: os.path.getctime(os.path.join(UPLOAD_FOLDER, x)))
+        ydl = _get_ytdl('download')
+        info = ydl.extract_info(post_url, download=True)
+        
+        if info:
+            # Final path after any post-processing; prepare_filename is the pre-download guess
+            downloads = info.get('requested_downloads') or [{}]
+            filepath = downloads[-1].get('filepath') or ydl.prepare_filename(info)
+            if os.path.exists(filepath):
+                latest_file = os.path.basename(filepath)
                 
                 # Upload to Google Drive if enabled
                 gdrive_file_id = None
                 if USE_GDRIVE:
                     try:
                         local_path = os.path.join(UPLOAD_FOLDER, latest_file)
-                        gdrive_file_id = gdrive_manager.upload_video(local_path, latest_file)
+                        # A temporary copy (deleted after the YouTube upload) must not reuse an archived file
+                        gdrive_file_id = gdrive_manager.upload_video(local_path, latest_file,
+                                                                     reuse_existing=not keep_local)
                         if gdrive_file_id:
                             print(f"☁️ Video uploaded to Google Drive: {latest_file}")
                             # Delete local file after upload
-                            os.remove(local_path)
-                            print(f"🗑️ Local file deleted: {latest_file}")
+                            if not keep_local:
+                                os.remove(local_path)
+                                print(f"🗑️ Local file deleted: {latest_file}")
                     except Exception as e:
                         print(f"⚠️ Google Drive upload error: {e}")
                 
                 return latest_file, True, "Success", gdrive_file_id
         
-        return None, False, result.stderr or "Download failed", None
+        return None, False, "Download failed", None
         
-    except subprocess.TimeoutExpired:
-        return None, False, "Download timeout", None
     except Exception as e:
         return None, False, str(e), None
 
@@ -369,7 +642,7 @@ def download_video_ytdlp(post_url):
 
 @app.route(f"/{UPLOAD_FOLDER}/<filename>")
 def download_file(filename):
-    """Serve downloaded files"""
+    """Serve downloaded files (Flask handles Range/If-None-Match, so clients can resume or reuse cached copies)"""
     return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
 
 @app.route("/manual", methods=["GET", "POST"])
@@ -389,9 +662,12 @@ def manual():
         
         # Validate Instagram URLs
         valid_urls = []
+        shortcodes = {}  # url -> post/reel shortcode captured while validating
         for url in urls:
-            if 'instagram.com' in url and ('/p/' in url or '/reel/' in url):
+            match = INSTA_RE.search(url)
+            if match and url not in shortcodes:
                 valid_urls.append(url)
+                shortcodes[url] = match.group('code')
         
         if not valid_urls:
             return render_template('error.html',
@@ -400,61 +676,75 @@ def manual():
                 message="No valid Instagram URLs found. Make sure URLs contain 'instagram.com/p/' or 'instagram.com/reel/'")
         
         # Check yt-dlp
-        try:
-            subprocess.run(['yt-dlp', '--version'], capture_output=True, check=True)
-        except:
+        if not YTDLP_AVAILABLE:
             return render_template('error.html',
                 title="yt-dlp Not Installed",
                 heading="⚠️ yt-dlp Not Installed",
                 message="Please install yt-dlp first: pip3 install yt-dlp")
         
-        # Check for duplicates FIRST
+        # Check for duplicates FIRST, so metadata is only fetched for new URLs
         downloaded = []
         skipped = []
         failed = []
+        new_urls = []
         
         for url in valid_urls:
-            # Fetch metadata (username and description)
-            print(f"\n🔍 Fetching metadata for: {url}")
-            username, description = get_instagram_metadata(url)
-            
-            if username:
-                print(f"👤 Username: @{username}")
-            if description:
-                print(f"📝 Description: {description[:100]}..." if len(description) > 100 else f"📝 Description: {description}")
-            
-            # Check if already downloaded
             if is_already_downloaded(url):
                 print(f"⏭️ Skipping (already downloaded): {url}")
+                # Reuse the metadata stored with the original download
+                entry = get_downloaded_entry(url) or {}
                 skipped.append({
                     'url': url,
                     'reason': 'Already downloaded',
-                    'username': username or 'Unknown',
-                    'description': description or 'No description available'
+                    'username': entry.get('username') or 'Unknown',
+                    'description': entry.get('description') or 'No description available'
                 })
-                continue
+            else:
+                new_urls.append(url)
+        
+        # Fetch metadata (username and description) for the new URLs
+        print(f"\n🔍 Fetching metadata for {len(new_urls)} URL(s)")
+        metadata_by_url = get_instagram_metadata_batch(new_urls)
+        
+        def process_one(url):
+            """Download a single new URL, returns (status, result dict)"""
+            username, description = metadata_by_url[url]
+            
+            if username:
+                print(f"👤 Username: @{username}")
+            if description:
+                print(f"📝 Description: {description[:100]}..." if len(description) > 100 else f"📝 Description: {description}")
             
             print(f"\n📥 Downloading: {url}")
             filename, success, message, gdrive_file_id = download_video_ytdlp(url)
             
             if success:
-                save_downloaded_link(url, filename, gdrive_file_id=gdrive_file_id)
-                downloaded.append({
-                    'url': url,
-                    'filename': filename,
-                    'shortcode': url.split('/')[-2] if '/' in url else 'unknown',
-                    'username': username or 'Unknown',
-                    'description': description or 'No description available'
-                })
+                save_downloaded_link(url, filename, gdrive_file_id=gdrive_file_id,
+                                     username=username, description=description)
                 print(f"✅ Downloaded: {filename}")
-            else:
-                failed.append({
+                return 'downloaded', {
                     'url': url,
-                    'error': message,
+                    'filename': filename,
+                    'shortcode': shortcodes[url],
                     'username': username or 'Unknown',
                     'description': description or 'No description available'
-                })
-                print(f"❌ Failed: {message}")
+                }
+            
+            print(f"❌ Failed: {message}")
+            return 'failed', {
+                'url': url,
+                'error': message,
+                'username': username or 'Unknown',
+                'description': description or 'No description available'
+            }
+        
+        # Download URLs in parallel on the shared yt-dlp worker pool
+        if new_urls:
+            results = list(_ytdl_pool.map(process_one, new_urls))
+            
+            buckets = {'downloaded': downloaded, 'failed': failed}
+            for status, result in results:
+                buckets[status].append(result)
         
         return render_template('results.html',
             hashtag="Manual URLs",
@@ -508,7 +798,7 @@ def instagram_to_youtube():
             return jsonify({'success': False, 'error': 'No URL provided'}), 400
         
         # Validate Instagram URL
-        if 'instagram.com' not in url or ('/p/' not in url and '/reel/' not in url):
+        if not INSTA_RE.search(url):
             return jsonify({'success': False, 'error': 'Invalid Instagram URL'}), 400
         
         try:
@@ -536,7 +826,7 @@ def instagram_to_youtube():
             
             # Step 2: Download video from Instagram and upload to Google Drive
             print(f"\n📥 Downloading from Instagram...")
-            filename, success, message, gdrive_file_id = download_video_ytdlp(url)
+            filename, success, message, gdrive_file_id = download_video_ytdlp(url, keep_local=True)
             
             if not success:
                 return jsonify({
@@ -545,19 +835,8 @@ def instagram_to_youtube():
                     'error': f'Download failed: {message}'
                 }), 500
             
-            # If using Google Drive, download video from GDrive for YouTube upload
-            if USE_GDRIVE and gdrive_file_id:
-                video_path = os.path.join(UPLOAD_FOLDER, filename)
-                print(f"\n☁️ Downloading from Google Drive for YouTube upload...")
-                gdrive_success = gdrive_manager.download_video(gdrive_file_id, video_path)
-                if not gdrive_success:
-                    return jsonify({
-                        'step': 'gdrive_download',
-                        'success': False,
-                        'error': 'Failed to download video from Google Drive'
-                    }), 500
-            else:
-                video_path = os.path.join(UPLOAD_FOLDER, filename)
+            # The local copy is kept for the YouTube upload, no need to fetch it back from Google Drive
+            video_path = os.path.join(UPLOAD_FOLDER, filename)
             
             # Step 3: Upload to YouTube
             print(f"\n📤 Uploading to YouTube...")
@@ -601,7 +880,8 @@ Original: {url}
                         print(f"🗑️ Local temp file deleted: {filename}")
                 
                 # Save metadata to tracking with YouTube URL (gdrive_file_id=None since we deleted it)
-                save_downloaded_link(url, filename, youtube_url_result, gdrive_file_id=None)
+                save_downloaded_link(url, filename, youtube_url_result, gdrive_file_id=None,
+                                     username=username, description=description)
                 print(f"✅ Uploaded to YouTube: {youtube_url_result}")
                 return jsonify({
                     'step': 'complete',
@@ -655,10 +935,9 @@ if __name__ == "__main__":
         print(f"⚠️  YouTube setup error: {e}")
     
     # Check yt-dlp
-    try:
-        subprocess.run(['yt-dlp', '--version'], capture_output=True, check=True)
+    if YTDLP_AVAILABLE:
         print("✅ yt-dlp is installed and ready!")
-    except:
+    else:
         print("⚠️  yt-dlp is NOT installed!")
         print("\nInstall it with: pip3 install yt-dlp\n")
     
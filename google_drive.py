@@ -1,21 +1,69 @@
 import os
 import json
-import pickle
+import atexit
+import functools
+import gzip
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload, build_http
 import io
+import logging
+import sqlite3
+
+# orjson is optional here too; stdlib json is used when it is not installed
+try:
+    import orjson
+    USE_ORJSON = True
+except ImportError:
+    USE_ORJSON = False
 
 # Google Drive API Scopes
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
 # Files
-TOKEN_FILE = 'token.pickle'
+TOKEN_FILE = 'token.json'
+LEGACY_TOKEN_FILE = 'token.pickle'  # Migrated to TOKEN_FILE on first load
 CREDENTIALS_FILE = 'client_secret.json'  # Changed from credentials.json
-GDRIVE_FILENAME = 'instagram_downloads.json'
+GDRIVE_FILENAME = 'instagram_downloads.json.gz'  # Gzipped metadata JSON
+LEGACY_GDRIVE_FILENAME = 'instagram_downloads.json'  # Read until the first gzipped upload replaces it
 GDRIVE_FOLDER_NAME = 'InstagramVideos'  # Folder for video storage
+PENDING_FLUSH_EVERY = 50  # add_downloaded_link uploads after this many buffered links
+BATCH_LIMIT = 100  # Max calls per Drive batch request
+VIDEO_CHUNK_SIZE = 16 * 1024 * 1024  # Resumable video upload chunk size
+DOWNLOAD_CHUNK_SIZE = 10 * 1024 * 1024  # Range request size for video downloads (library default is 100KB)
+HTTP_TIMEOUT = 60  # Socket timeout (seconds) for Drive API connections
+LOCAL_DB = 'gdrive_pending.db'  # Local journal of buffered links, so they survive a restart
+NUM_RETRIES = 5  # Retries with exponential backoff on 429/5xx and rate-limit errors
+
+# Drive queries built from the constants above, so they are formatted once at import
+_FOLDER_Q = f"name='{GDRIVE_FOLDER_NAME}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+_FILE_Q = f"name='{GDRIVE_FILENAME}' and trashed=false"
+_LEGACY_FILE_Q = f"name='{LEGACY_GDRIVE_FILENAME}' and trashed=false"
+_LOOKUP_Q = f"({_FOLDER_Q}) or ({_FILE_Q}) or ({_LEGACY_FILE_Q})"
+
+# Per-operation progress goes to the debug log; setup_google_drive keeps the user-facing prints
+log = logging.getLogger(__name__)
+
+class DriveAuthError(Exception):
+    """Raised when a Drive operation is attempted but authentication fails"""
+
+
+def _requires_service(method):
+    """Authenticate on first use; raise DriveAuthError if that is not possible"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.service is None and not self.authenticate():
+            raise DriveAuthError("Google Drive authentication failed")
+        return method(self, *args, **kwargs)
+    return wrapper
+
 
 class GoogleDriveManager:
     """Manage Google Drive operations for tracking downloaded links and storing videos"""
@@ -23,16 +71,73 @@ class GoogleDriveManager:
     def __init__(self):
         self.service = None
         self.file_id = None  # Metadata JSON file ID
+        self._file_is_legacy = False  # file_id points at the uncompressed LEGACY_GDRIVE_FILENAME
         self.folder_id = None  # Video folder ID
+        self._looked_up = False  # _lookup_files has run; missing IDs really are missing on Drive
+        self._cache = None  # Parsed metadata JSON as of _cache_mtime
+        self._cache_mtime = None  # Drive modifiedTime of the cached metadata
+        self._url_set = set()  # URLs in the cached metadata, for O(1) duplicate checks
+        self._creds = None
+        self._local = threading.local()  # Per-thread Drive services
+        self._folder_lock = threading.Lock()
+        self._db = None  # sqlite3 connection to LOCAL_DB, opened on first use
+        self._db_lock = threading.Lock()
+        self._pending = self._load_pending()  # Links added by add_downloaded_link but not uploaded yet
         
+    def _pending_db(self):
+        """Open (and create if needed) the local pending-links journal"""
+        if self._db is None:
+            self._db = sqlite3.connect(LOCAL_DB, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS pending_links '
+                '(url TEXT, filename TEXT, downloaded_at TEXT, PRIMARY KEY (url, downloaded_at))'
+            )
+        return self._db
+    
+    def _load_pending(self):
+        """Recover links that were buffered but never uploaded by a previous run"""
+        if not os.path.exists(LOCAL_DB):
+            return []
+        with self._db_lock:
+            rows = self._pending_db().execute(
+                'SELECT url, filename, downloaded_at FROM pending_links ORDER BY rowid'
+            ).fetchall()
+        return [{"url": url, "filename": filename, "downloaded_at": downloaded_at}
+                for url, filename, downloaded_at in rows]
+    
+    def _clear_pending(self, uploaded):
+        """Forget the buffered links that are in the uploaded data; the rest wait for the next upload"""
+        present = {(item["url"], item.get("downloaded_at")) for item in uploaded["links"]}
+        done = [entry for entry in self._pending if (entry["url"], entry["downloaded_at"]) in present]
+        if not done:
+            return
+        self._pending = [entry for entry in self._pending if (entry["url"], entry["downloaded_at"]) not in present]
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.executemany(
+                    'DELETE FROM pending_links WHERE url = ? AND downloaded_at = ?',
+                    [(entry["url"], entry["downloaded_at"]) for entry in done]
+                )
+    
     def authenticate(self):
         """Authenticate with Google Drive"""
         creds = None
         
         # Load token if exists
         if os.path.exists(TOKEN_FILE):
-            with open(TOKEN_FILE, 'rb') as token:
+            try:
+                creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+            except ValueError as e:
+                # to_json() omits a missing refresh_token, which from_authorized_user_file rejects
+                print(f"⚠️  Unusable Google Drive token ({e}), logging in again")
+        elif os.path.exists(LEGACY_TOKEN_FILE):
+            import pickle
+            with open(LEGACY_TOKEN_FILE, 'rb') as token:
                 creds = pickle.load(token)
+            with open(TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
+            os.remove(LEGACY_TOKEN_FILE)
+            log.debug("Migrated Google Drive token to JSON")
         
         # If no valid credentials, login
         if not creds or not creds.valid:
@@ -61,40 +166,59 @@ class GoogleDriveManager:
                 creds = flow.run_local_server(port=0)
             
             # Save credentials
-            with open(TOKEN_FILE, 'wb') as token:
-                pickle.dump(creds, token)
+            with open(TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
         
-        self.service = build('drive', 'v3', credentials=creds)
-        print("✅ Google Drive authenticated successfully!")
+        self._creds = creds
+        self.service = self._build_service()
+        self._local.service = self.service  # The authenticating thread reuses the main service
+        log.debug("Google Drive authenticated")
         return True
     
+    def _lookup_files(self):
+        """Find the metadata file and the video folder with a single files.list call"""
+        results = self._thread_service().files().list(
+            q=_LOOKUP_Q,
+            spaces='drive',
+            fields='files(id, name, mimeType)',
+            pageSize=10
+        ).execute(num_retries=NUM_RETRIES)
+        
+        found = {}
+        for file in results.get('files', []):
+            found.setdefault(file['name'], file['id'])
+        
+        if GDRIVE_FOLDER_NAME in found and not self.folder_id:
+            self.folder_id = found[GDRIVE_FOLDER_NAME]
+            log.debug("Found existing folder: %s (ID: %s)", GDRIVE_FOLDER_NAME, self.folder_id)
+        
+        # Prefer the gzipped file; the legacy one is only read until it is replaced
+        for name in (GDRIVE_FILENAME, LEGACY_GDRIVE_FILENAME):
+            if name in found and not self.file_id:
+                self.file_id = found[name]
+                self._file_is_legacy = name == LEGACY_GDRIVE_FILENAME
+                log.debug("Found existing metadata file: %s (ID: %s)", name, self.file_id)
+        self._looked_up = True
+    
     def find_or_create_folder(self):
         """Find or create the video storage folder in Google Drive"""
         try:
-            # Search for existing folder
-            results = self.service.files().list(
-                q=f"name='{GDRIVE_FOLDER_NAME}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
-                spaces='drive',
-                fields='files(id, name)'
-            ).execute()
+            # Search for existing folder (also picks up the metadata file)
+            if not self.folder_id and not self._looked_up:
+                self._lookup_files()
             
-            files = results.get('files', [])
-            
-            if files:
-                self.folder_id = files[0]['id']
-                print(f"✅ Found existing folder: {GDRIVE_FOLDER_NAME} (ID: {self.folder_id})")
-            else:
+            if not self.folder_id:
                 # Create new folder
                 file_metadata = {
                     'name': GDRIVE_FOLDER_NAME,
                     'mimeType': 'application/vnd.google-apps.folder'
                 }
-                folder = self.service.files().create(
+                folder = self._thread_service().files().create(
                     body=file_metadata,
                     fields='id'
-                ).execute()
+                ).execute(num_retries=NUM_RETRIES)
                 self.folder_id = folder.get('id')
-                print(f"✅ Created new folder: {GDRIVE_FOLDER_NAME} (ID: {self.folder_id})")
+                log.debug("Created new folder: %s (ID: %s)", GDRIVE_FOLDER_NAME, self.folder_id)
             
             return True
         except Exception as e:
@@ -104,44 +228,62 @@ class GoogleDriveManager:
     def find_file(self):
         """Find the JSON file in Google Drive"""
         try:
-            results = self.service.files().list(
-                q=f"name='{GDRIVE_FILENAME}' and trashed=false",
-                spaces='drive',
-                fields='files(id, name)'
-            ).execute()
-            
-            files = results.get('files', [])
+            if not self._looked_up:
+                self._lookup_files()
             
-            if files:
-                self.file_id = files[0]['id']
-                print(f"✅ Found existing metadata file: {GDRIVE_FILENAME} (ID: {self.file_id})")
-                return True
-            else:
-                print(f"⚠️  Metadata file not found, will create new one")
-                return False
+            return bool(self.file_id)
         except Exception as e:
             print(f"❌ Error finding file: {e}")
             return False
     
+    def _set_cache(self, data, modified_time):
+        """Remember data as the current metadata version and rebuild the URL set
+        
+        Buffered links missing from data (recovered from LOCAL_DB, or added before the
+        file changed on Drive) are merged in, so whatever is uploaded next includes them.
+        """
+        present = {(item["url"], item.get("downloaded_at")) for item in data["links"]}
+        for entry in self._pending:
+            if (entry["url"], entry["downloaded_at"]) not in present:
+                data["links"].append(entry)
+        data["count"] = len(data["links"])
+        self._cache = data
+        self._cache_mtime = modified_time
+        self._url_set = {item["url"] for item in data["links"]}
+    
     def download_file(self):
         """Download JSON file from Google Drive"""
         try:
             if not self.file_id:
-                if not self.find_file():
-                    # File doesn't exist, return empty data
-                    return {"links": [], "count": 0}
+                if not self._looked_up:
+                    self._lookup_files()
+                if not self.file_id:
+                    # File doesn't exist yet: cache an empty version so flush() can create it
+                    if self._cache is None:
+                        self._set_cache({"links": [], "count": 0}, None)
+                    return self._cache
             
-            request = self.service.files().get_media(fileId=self.file_id)
+            # Cheap metadata call first; only download when the file changed
+            modified_time = self.get_file_modified_time()
+            if self._cache is not None and modified_time == self._cache_mtime:
+                return self._cache
+            
+            request = self._thread_service().files().get_media(fileId=self.file_id)
             fh = io.BytesIO()
             downloader = MediaIoBaseDownload(fh, request)
             
             done = False
             while not done:
-                status, done = downloader.next_chunk()
+                status, done = downloader.next_chunk(num_retries=NUM_RETRIES)
             
-            fh.seek(0)
-            data = json.loads(fh.read().decode('utf-8'))
-            print(f"✅ Downloaded file from Google Drive ({data['count']} links)")
+            # Parse straight from the buffer without copying it out first (the legacy file is plain JSON)
+            raw = fh.getbuffer()
+            if raw[:2] == b'\x1f\x8b':
+                raw = gzip.decompress(raw)
+            data = orjson.loads(raw) if USE_ORJSON else json.loads(bytes(raw))
+            data["count"] = len(data["links"])
+            log.debug("Downloaded file from Google Drive (%d links)", data['count'])
+            self._set_cache(data, modified_time)
             return data
             
         except Exception as e:
@@ -151,156 +293,269 @@ class GoogleDriveManager:
     def upload_file(self, data):
         """Upload/Update JSON file to Google Drive"""
         try:
-            # Convert data to JSON
-            json_data = json.dumps(data, indent=2)
-            
-            # Create temporary file
-            temp_file = 'temp_downloads.json'
-            with open(temp_file, 'w') as f:
-                f.write(json_data)
+            # Convert data to gzipped JSON and upload straight from memory (no temp file)
+            raw = orjson.dumps(data) if USE_ORJSON else json.dumps(data).encode('utf-8')
+            buf = io.BytesIO(gzip.compress(raw, compresslevel=6))
             
             file_metadata = {'name': GDRIVE_FILENAME}
-            media = MediaFileUpload(temp_file, mimetype='application/json', resumable=True)
+            # Small file: a single multipart request instead of a resumable session
+            media = MediaIoBaseUpload(buf, mimetype='application/gzip', resumable=False)
             
-            if self.file_id:
+            if self.file_id and not self._file_is_legacy:
                 # Update existing file
-                self.service.files().update(
+                file = self._thread_service().files().update(
                     fileId=self.file_id,
-                    media_body=media
-                ).execute()
-                print(f"✅ Updated file on Google Drive ({data['count']} links)")
+                    media_body=media,
+                    fields='modifiedTime'
+                ).execute(num_retries=NUM_RETRIES)
+                log.debug("Updated file on Google Drive (%d links)", data['count'])
             else:
                 # Create new file
-                file = self.service.files().create(
+                file = self._thread_service().files().create(
                     body=file_metadata,
                     media_body=media,
-                    fields='id'
-                ).execute()
+                    fields='id, modifiedTime'
+                ).execute(num_retries=NUM_RETRIES)
                 self.file_id = file.get('id')
-                print(f"✅ Created new file on Google Drive (ID: {self.file_id})")
-            
-            # Clean up temp file
-            os.remove(temp_file)
+                self._file_is_legacy = False
+                log.debug("Created new file on Google Drive (ID: %s)", self.file_id)
+            # What we just uploaded is now the current version; drop the buffered links it contains
+            self._clear_pending(data)
+            self._set_cache(data, file.get('modifiedTime'))
             return True
             
         except Exception as e:
             print(f"❌ Error uploading file: {e}")
+            # Callers may have modified the cached dict before this failed upload
+            self._cache = None
+            self._url_set = set()
             return False
     
+    @_requires_service
+    def get_file_modified_time(self):
+        """Get the metadata file's modifiedTime without downloading it (None if missing)"""
+        if not self.file_id:
+            if not self.find_file():
+                return None
+        
+        file = self._thread_service().files().get(
+            fileId=self.file_id,
+            fields='modifiedTime, md5Checksum'
+        ).execute(num_retries=NUM_RETRIES)
+        return file.get('modifiedTime')
+    
+    @_requires_service
     def get_downloaded_links(self):
         """Get list of downloaded links from Google Drive"""
-        if not self.service:
-            if not self.authenticate():
-                return {"links": [], "count": 0}
-        
         return self.download_file()
     
+    @_requires_service
     def add_downloaded_link(self, url, filename):
         """Add a new downloaded link to Google Drive"""
-        if not self.service:
-            if not self.authenticate():
-                return False
-        
-        # Get current data
+        # Get current data (cached unless the file changed on Drive)
         data = self.download_file()
         
-        # Add new link
-        from datetime import datetime
-        data["links"].append({
+        # Add new link to the cached data; it is uploaded with the next flush
+        entry = {
             "url": url,
             "filename": filename,
-            "downloaded_at": datetime.now().isoformat()
-        })
+            "downloaded_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())  # Same UTC format as app.py
+        }
+        data["links"].append(entry)
         data["count"] = len(data["links"])
+        self._url_set.add(url)
+        self._pending.append(entry)
+        with self._db_lock, self._pending_db() as db:
+            db.execute(
+                'INSERT OR IGNORE INTO pending_links (url, filename, downloaded_at) VALUES (?, ?, ?)',
+                (url, filename, entry["downloaded_at"])
+            )
         
-        # Upload updated data
+        if len(self._pending) >= PENDING_FLUSH_EVERY:
+            return self.flush()
+        return True
+    
+    def flush(self):
+        """Upload links buffered by add_downloaded_link"""
+        if not self._pending:
+            return True
+        
+        data = self.download_file()
+        if data is not self._cache:
+            # Download failed, keep the buffer for the next attempt
+            return False
+        
+        # Upload updated data (_set_cache already merged the buffered links into it)
         return self.upload_file(data)
     
+    @_requires_service
     def is_already_downloaded(self, url):
         """Check if URL was already downloaded"""
-        if not self.service:
-            if not self.authenticate():
-                return False
-        
         data = self.download_file()
-        return any(item["url"] == url for item in data["links"])
+        # Uncached data means the download failed and came back empty
+        return data is self._cache and url in self._url_set
     
-    def upload_video(self, local_path, filename):
-        """Upload video to Google Drive folder"""
+    @_requires_service
+    def upload_video(self, local_path, filename, reuse_existing=True):
+        """Upload video to Google Drive folder
+        
+        With reuse_existing, an identical file already in the folder is returned instead of uploading.
+        """
         try:
-            if not self.service:
-                if not self.authenticate():
-                    return None
+            with self._folder_lock:
+                if not self.folder_id:
+                    self.find_or_create_folder()
             
-            if not self.folder_id:
-                self.find_or_create_folder()
+            # Skip the upload if an identical file is already in the folder
+            existing_id = reuse_existing and self._find_identical_video(local_path, filename)
+            if existing_id:
+                log.debug("Video already on Google Drive: %s (ID: %s)", filename, existing_id)
+                return existing_id
             
             file_metadata = {
                 'name': filename,
                 'parents': [self.folder_id]
             }
             
-            media = MediaFileUpload(local_path, resumable=True)
+            media = MediaFileUpload(local_path, chunksize=VIDEO_CHUNK_SIZE, resumable=True)
             
-            file = self.service.files().create(
+            file = self._thread_service().files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, webViewLink'
-            ).execute()
+            ).execute(num_retries=NUM_RETRIES)
             
             file_id = file.get('id')
             file_name = file.get('name')
             web_link = file.get('webViewLink')
             
-            print(f"✅ Uploaded video to Google Drive: {file_name} (ID: {file_id})")
+            log.debug("Uploaded video to Google Drive: %s (ID: %s)", file_name, file_id)
             return file_id
             
         except Exception as e:
             print(f"❌ Error uploading video to Google Drive: {e}")
             return None
     
+    def _find_identical_video(self, local_path, filename):
+        """Return the ID of a same-named file in the video folder with a matching MD5, or None"""
+        escaped_name = filename.replace('\\', '\\\\').replace("'", "\\'")
+        results = self._thread_service().files().list(
+            q=f"'{self.folder_id}' in parents and name='{escaped_name}' and trashed=false",
+            spaces='drive',
+            fields='files(id, md5Checksum)',
+            pageSize=10
+        ).execute(num_retries=NUM_RETRIES)
+        
+        files = results.get('files', [])
+        if not files:
+            # Usual case for a new video: no need to read the file at all
+            return None
+        
+        md5 = hashlib.md5()
+        with open(local_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(block)
+        
+        digest = md5.hexdigest()
+        for file in files:
+            if file.get('md5Checksum') == digest:
+                return file['id']
+        return None
+    
+    def upload_videos(self, items, max_workers=4):
+        """Upload several (local_path, filename) videos concurrently, returns file IDs in order
+        
+        Concurrency defaults to 4 to stay under Drive's per-user write rate limit.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda item: self.upload_video(*item), items))
+    
+    def _build_service(self):
+        """Build a Drive service on its own persistent, authorized HTTP connection
+        
+        httplib2 keeps the TLS connection to googleapis.com open between calls,
+        so every request after the first on a service skips the handshake.
+        build_http() is used because it stops httplib2 treating the 308 that
+        resumable uploads return for each intermediate chunk as a redirect.
+        """
+        base_http = build_http()
+        base_http.timeout = HTTP_TIMEOUT
+        http = AuthorizedHttp(self._creds, http=base_http)
+        return build('drive', 'v3', http=http, cache_discovery=False)
+    
+    def _thread_service(self):
+        """Drive service for the calling thread (httplib2 connections are not thread-safe)"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            if self._creds is None:
+                raise DriveAuthError("Google Drive is not authenticated")
+            service = self._build_service()
+            self._local.service = service
+        return service
+    
+    @_requires_service
     def download_video(self, file_id, output_path):
         """Download video from Google Drive"""
         try:
-            if not self.service:
-                if not self.authenticate():
-                    return False
-            
-            request = self.service.files().get_media(fileId=file_id)
+            request = self._thread_service().files().get_media(fileId=file_id)
             fh = io.FileIO(output_path, 'wb')
-            downloader = MediaIoBaseDownload(fh, request)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
             
             done = False
             while not done:
-                status, done = downloader.next_chunk()
+                status, done = downloader.next_chunk(num_retries=NUM_RETRIES)
                 if status:
-                    print(f"📥 Download progress: {int(status.progress() * 100)}%")
+                    log.debug("Download progress: %d%%", int(status.progress() * 100))
             
-            print(f"✅ Downloaded video from Google Drive to: {output_path}")
+            log.debug("Downloaded video from Google Drive to: %s", output_path)
             return True
             
         except Exception as e:
             print(f"❌ Error downloading video from Google Drive: {e}")
             return False
     
+    @_requires_service
     def delete_video(self, file_id):
         """Delete video from Google Drive (after YouTube upload)"""
         try:
-            if not self.service:
-                if not self.authenticate():
-                    return False
-            
-            self.service.files().delete(fileId=file_id).execute()
-            print(f"✅ Deleted video from Google Drive (ID: {file_id})")
+            self._thread_service().files().delete(fileId=file_id).execute(num_retries=NUM_RETRIES)
+            log.debug("Deleted video from Google Drive (ID: %s)", file_id)
             return True
             
         except Exception as e:
             print(f"❌ Error deleting video from Google Drive: {e}")
             return False
+    
+    @_requires_service
+    def delete_videos(self, file_ids):
+        """Delete several videos from Google Drive using batch requests, returns the number deleted"""
+        deleted = []
+        
+        def on_delete(request_id, response, exception):
+            if exception:
+                print(f"❌ Error deleting video from Google Drive (ID: {request_id}): {exception}")
+            else:
+                deleted.append(request_id)
+        
+        file_ids = list(dict.fromkeys(file_ids))  # Batch request IDs must be unique
+        try:
+            service = self._thread_service()
+            # One HTTP request per BATCH_LIMIT deletes instead of one per file
+            for start in range(0, len(file_ids), BATCH_LIMIT):
+                batch = service.new_batch_http_request(callback=on_delete)
+                for file_id in file_ids[start:start + BATCH_LIMIT]:
+                    batch.add(service.files().delete(fileId=file_id), request_id=file_id)
+                batch.execute()
+        except Exception as e:
+            print(f"❌ Error deleting videos from Google Drive: {e}")
+        
+        log.debug("Deleted %d video(s) from Google Drive", len(deleted))
+        return len(deleted)
 
 
 # Global instance
 gdrive_manager = GoogleDriveManager()
+atexit.register(gdrive_manager.flush)
 
 
 def setup_google_drive():
@@ -310,8 +565,11 @@ def setup_google_drive():
     print("="*70)
     
     if gdrive_manager.authenticate():
-        gdrive_manager.find_file()
+        print("✅ Google Drive authenticated successfully!")
+        # One lookup finds both the metadata file and the video folder
         gdrive_manager.find_or_create_folder()  # Create video folder
+        if not gdrive_manager.file_id:
+            print(f"⚠️  Metadata file not found, will create new one")
         data = gdrive_manager.get_downloaded_links()
         print(f"\n✅ Google Drive ready! Currently tracking {data['count']} downloads")
         print("="*70 + "\n")
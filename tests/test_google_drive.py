@@ -0,0 +1,147 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import google_drive
+from google_drive import GoogleDriveManager, PENDING_FLUSH_EVERY
+
+MODIFIED_TIME = '2026-01-01T00:00:00.000Z'
+
+
+class _Request:
+    """Stands in for a googleapiclient request; execute() returns a canned response"""
+
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self, num_retries=0):
+        return self.response
+
+
+class _Files:
+    """Minimal files() resource for a Drive that starts out empty"""
+
+    def __init__(self):
+        self.created = []
+        self.uploads = []  # URLs in each uploaded metadata file
+
+    def _record(self, media_body):
+        data = json.loads(gzip.decompress(media_body.getbytes(0, media_body.size())))
+        self.uploads.append([item['url'] for item in data['links']])
+
+    def list(self, **kwargs):
+        return _Request({'files': []})
+
+    def create(self, body=None, media_body=None, fields=None):
+        self.created.append(body)
+        self._record(media_body)
+        return _Request({'id': f'file-{len(self.created)}', 'modifiedTime': MODIFIED_TIME})
+
+    def update(self, fileId=None, media_body=None, fields=None):
+        self._record(media_body)
+        return _Request({'modifiedTime': MODIFIED_TIME})
+
+    def get(self, fileId=None, fields=None):
+        return _Request({'modifiedTime': MODIFIED_TIME})
+
+
+class _Service:
+    def __init__(self):
+        self.files_resource = _Files()
+
+    def files(self):
+        return self.files_resource
+
+
+class _DriveTestCase(unittest.TestCase):
+    """Managers share one fake Drive service and a temporary pending-links journal"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db = google_drive.LOCAL_DB
+        google_drive.LOCAL_DB = os.path.join(self.tmp.name, 'pending.db')
+        self.service = _Service()
+        self.managers = []
+        self.manager = self._new_manager()
+
+    def tearDown(self):
+        for manager in self.managers:
+            if manager._db is not None:
+                manager._db.close()
+        google_drive.LOCAL_DB = self.old_db
+        self.tmp.cleanup()
+
+    def _new_manager(self):
+        manager = GoogleDriveManager()
+        manager.service = self.service
+        manager._local.service = self.service
+        self.managers.append(manager)
+        return manager
+
+
+class FirstRunTest(_DriveTestCase):
+    """The metadata file does not exist on Drive yet"""
+
+    def test_added_link_is_seen_before_flush(self):
+        self.manager.add_downloaded_link('https://www.instagram.com/p/abc/', 'abc.mp4')
+        self.assertTrue(self.manager.is_already_downloaded('https://www.instagram.com/p/abc/'))
+
+    def test_flush_creates_the_file(self):
+        self.manager.add_downloaded_link('https://www.instagram.com/p/abc/', 'abc.mp4')
+        self.assertTrue(self.manager.flush())
+        self.assertEqual(self.service.files_resource.created, [{'name': google_drive.GDRIVE_FILENAME}])
+        self.assertEqual(self.manager.file_id, 'file-1')
+        self.assertEqual(self.manager._pending, [])
+
+    def test_pending_buffer_is_flushed_after_threshold(self):
+        for i in range(PENDING_FLUSH_EVERY + 10):
+            self.manager.add_downloaded_link(f'https://www.instagram.com/p/{i}/', f'{i}.mp4')
+        self.assertEqual(len(self.service.files_resource.created), 1)
+        self.assertEqual(len(self.manager._pending), 10)
+        self.assertEqual(self.manager.get_downloaded_links()['count'], PENDING_FLUSH_EVERY + 10)
+
+
+
+class RestartTest(_DriveTestCase):
+    """Links buffered by a previous run are recovered from the pending-links journal"""
+
+    def test_recovered_links_are_uploaded_with_the_next_save(self):
+        self.manager.add_downloaded_link('https://www.instagram.com/p/u1/', 'u1.mp4')
+        self.manager._db.close()
+        self.manager._db = None
+
+        manager = self._new_manager()
+        self.assertEqual(len(manager._pending), 1)
+        # Same steps as the app's save path: append to the cached data and upload it
+        data = manager.get_downloaded_links()
+        data['links'].append({'url': 'https://www.instagram.com/p/u2/', 'filename': 'u2.mp4'})
+        data['count'] = len(data['links'])
+        self.assertTrue(manager.upload_file(data))
+
+        self.assertEqual(self.service.files_resource.uploads[-1],
+                         ['https://www.instagram.com/p/u1/', 'https://www.instagram.com/p/u2/'])
+        self.assertEqual(manager._pending, [])
+
+
+
+class PendingLinksTest(_DriveTestCase):
+    """Buffered links are only forgotten once an upload actually contains them"""
+
+    def test_upload_without_buffered_links_keeps_them_pending(self):
+        self.manager.add_downloaded_link('https://www.instagram.com/p/u1/', 'u1.mp4')
+        # Cached data that lacks the buffered link, e.g. a newer version downloaded from Drive
+        other = {'links': [{'url': 'https://www.instagram.com/p/old/', 'filename': 'old.mp4'}], 'count': 1}
+        self.manager._cache = other
+        self.assertTrue(self.manager.upload_file(other))
+        self.assertEqual([entry['url'] for entry in self.manager._pending], ['https://www.instagram.com/p/u1/'])
+
+        self.assertTrue(self.manager.flush())
+        self.assertEqual(self.service.files_resource.uploads[-1],
+                         ['https://www.instagram.com/p/old/', 'https://www.instagram.com/p/u1/'])
+        self.assertEqual(self.manager._pending, [])
+
+
+if __name__ == '__main__':
+    unittest.main()